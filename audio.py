@@ -0,0 +1,57 @@
+import pygame
+
+# Game events that can make a sound
+ATE = "ate"
+SPECIAL_ATE = "special_ate"
+COLLISION = "collision"
+GAME_OVER = "game_over"
+
+
+class EventQueue:
+    """Events raised by the game logic since the last rendered frame.
+
+    Repeats of the same event collapse into one entry with a count, so the
+    queue stays tiny no matter how many ticks run between frames (or if no
+    one ever drains it, as in headless runs).
+    """
+
+    def __init__(self):
+        self._pending = {}  # Event -> number of times raised, in first-raised order
+
+    def emit(self, event):
+        self._pending[event] = self._pending.get(event, 0) + 1
+
+    def drain(self):
+        """Return the pending {event: count} and start a fresh batch."""
+        pending = self._pending
+        self._pending = {}
+        return pending
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class AudioSink:
+    """Plays drained game events through the mixer.
+
+    Each file is decoded to PCM once, when the sink is created, so playing a
+    sound never touches the mp3 decoder. Without a working audio device the
+    sink stays silent instead of failing.
+    """
+
+    def __init__(self, sound_files):
+        self.sounds = {}
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            for event, path in sound_files.items():
+                self.sounds[event] = pygame.mixer.Sound(path)  # Decoded into memory here
+        except pygame.error:
+            self.sounds = {}  # No audio available
+
+    def play(self, queue):
+        """Drain a queue, playing each distinct event once however often it was raised."""
+        for event in queue.drain():
+            sound = self.sounds.get(event)
+            if sound:
+                sound.play()
@@ -0,0 +1,169 @@
+from array import array
+from collections import deque
+import heapq
+
+# Distance stored for cells that cannot reach the goal (or are blocked)
+UNREACHABLE = 0xFFFF
+
+
+class DistanceField:
+    """BFS distance-to-goal map over a grid, kept up to date as cells are blocked or freed.
+
+    The field is computed once per goal (food spawn) and then repaired locally
+    whenever a cell is occupied or vacated, so the snake can pick its next move
+    by comparing the distances of its four neighbours instead of running a
+    search every tick. Blocks are reference counted, which lets several snakes
+    (and the barriers) share one field.
+    """
+
+    def __init__(self, width, height, goal=None, blocked=()):
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.dist = array('H', [UNREACHABLE]) * self.size
+        self.blocked = bytearray(self.size)  # Number of occupants of each cell
+        self.goal = None
+
+        # Precompute the in-bounds neighbours of every cell
+        self.neighbours = []
+        for i in range(self.size):
+            x, y = i % width, i // width
+            cells = []
+            if y > 0:
+                cells.append(i - width)
+            if y < height - 1:
+                cells.append(i + width)
+            if x > 0:
+                cells.append(i - 1)
+            if x < width - 1:
+                cells.append(i + 1)
+            self.neighbours.append(tuple(cells))
+
+        for pos in blocked:
+            self.blocked[self.index(pos)] += 1
+        if goal is not None:
+            self.set_goal(goal)
+
+    def index(self, pos):
+        return pos[1] * self.width + pos[0]
+
+    def position(self, i):
+        return (i % self.width, i // self.width)
+
+    def distance(self, pos):
+        """Number of steps from pos to the goal, or UNREACHABLE."""
+        return self.dist[self.index(pos)]
+
+    def reachable(self, pos):
+        return self.dist[self.index(pos)] != UNREACHABLE
+
+    def is_blocked(self, pos):
+        return self.blocked[self.index(pos)] > 0
+
+    def next_step(self, pos):
+        """Return the free neighbour of pos closest to the goal, or None if the goal is unreachable."""
+        best, best_dist = None, UNREACHABLE
+        dist = self.dist
+        for n in self.neighbours[self.index(pos)]:
+            if dist[n] < best_dist:
+                best, best_dist = n, dist[n]
+        return None if best is None else self.position(best)
+
+    def set_goal(self, goal):
+        """Move the goal and rebuild the whole field with a single BFS."""
+        self.goal = self.index(goal)
+        self._rebuild()
+
+    def block(self, pos):
+        """Mark pos as occupied, repairing the distances that relied on it."""
+        i = self.index(pos)
+        self.blocked[i] += 1
+        if self.blocked[i] == 1:
+            self._on_block(i)
+
+    def unblock(self, pos):
+        """Release one occupant of pos, propagating any shortcut it opens up."""
+        i = self.index(pos)
+        self.blocked[i] -= 1
+        if self.blocked[i] == 0:
+            self._on_unblock(i)
+
+    def _rebuild(self):
+        dist, blocked, neighbours = self.dist, self.blocked, self.neighbours
+        for i in range(self.size):
+            dist[i] = UNREACHABLE
+        if self.goal is None or blocked[self.goal]:
+            return
+        dist[self.goal] = 0
+        queue = deque([self.goal])
+        while queue:
+            current = queue.popleft()
+            d = dist[current] + 1
+            for n in neighbours[current]:
+                if not blocked[n] and dist[n] == UNREACHABLE:
+                    dist[n] = d
+                    queue.append(n)
+
+    def _on_block(self, i):
+        dist, blocked, neighbours = self.dist, self.blocked, self.neighbours
+        if dist[i] == UNREACHABLE:
+            return
+        if i == self.goal:
+            self._rebuild()
+            return
+
+        # Invalidate every cell whose only shortest route ran through i. Cells are
+        # visited level by level, so all invalidations at one level are known
+        # before the next level checks for another supporting neighbour.
+        invalid = [i]
+        queue = deque([(i, dist[i])])
+        dist[i] = UNREACHABLE
+        while queue:
+            current, d = queue.popleft()
+            for n in neighbours[current]:
+                if blocked[n] or dist[n] != d + 1:
+                    continue
+                if any(dist[m] == d and not blocked[m] for m in neighbours[n]):
+                    continue  # Still supported by another cell at distance d
+                dist[n] = UNREACHABLE
+                invalid.append(n)
+                queue.append((n, d + 1))
+
+        # Re-seed the invalidated cells from their valid neighbours and repair outwards
+        heap = []
+        for cell in invalid:
+            if blocked[cell]:
+                continue
+            best = min(dist[m] for m in neighbours[cell])
+            if best != UNREACHABLE:
+                dist[cell] = best + 1
+                heap.append((best + 1, cell))
+        heapq.heapify(heap)
+        while heap:
+            d, current = heapq.heappop(heap)
+            if d > dist[current]:
+                continue
+            for n in neighbours[current]:
+                if not blocked[n] and dist[n] > d + 1:
+                    dist[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
+
+    def _on_unblock(self, i):
+        dist, blocked, neighbours = self.dist, self.blocked, self.neighbours
+        if i == self.goal:
+            self._rebuild()
+            return
+        if self.goal is None:
+            return
+        best = min(dist[m] for m in neighbours[i])
+        if best == UNREACHABLE:
+            return
+        dist[i] = best + 1
+        queue = deque([i])
+        while queue:
+            current = queue.popleft()
+            d = dist[current] + 1
+            for n in neighbours[current]:
+                if not blocked[n] and dist[n] > d:
+                    dist[n] = d
+                    queue.append(n)
@@ -1,20 +1,30 @@
 import pygame
 import random
-import os
+from collections import Counter
+
+from audio import ATE, GAME_OVER, SPECIAL_ATE, AudioSink, EventQueue
+from run_history import RunHistory
+from scheduler import Scheduler
+from screens import STAY, get_font, run_screen
+from spectate import SpectatorServer
 
 # Initialize Pygame
 pygame.init()
-# Load sounds
-pygame.mixer.init()
-eat_sound = pygame.mixer.Sound('audio/eat_sound.mp3')  # Sound for eating food
-eat_special_sound = pygame.mixer.Sound(r'audio/eat_special_sound.mp3')  # Sound for eating special food
-game_over_sound = pygame.mixer.Sound(r'audio/game_over.mp3')  # Sound for game over
+# Sound effects, played for the events the game logic raises
+audio = AudioSink({
+    ATE: 'audio/eat_sound.mp3',  # Sound for eating food
+    SPECIAL_ATE: 'audio/eat_special_sound.mp3',  # Sound for eating special food
+    GAME_OVER: 'audio/game_over.mp3',  # Sound for game over
+})
 
 # pygame.mixer.music.load(r'audio/background_music.mp3')  # Background music
 # pygame.mixer.music.play(-1)  # Play music indefinitely
 
-# High score file
-HIGH_SCORE_FILE = "stats/high_score.txt"
+# Every finished game is recorded here; high scores come from its leaderboard
+run_history = RunHistory()
+
+# High score file used before the run history; imported on first start
+LEGACY_HIGH_SCORE_FILE = "stats/high_score.txt"
 
 # Screen dimensions and grid size
 GRID_SIZE = 20
@@ -34,9 +44,14 @@ DOWN = (0, 1)
 LEFT = (-1, 0)
 RIGHT = (1, 0)
 
+# Set to a port (e.g. 8765) to stream games to spectators (python spectate.py)
+SPECTATOR_PORT = None
+
 # Game modes
 FREE_PLAY = 0
 TIMED_MODE = 1
+MODE_NAMES = {FREE_PLAY: "free_play", TIMED_MODE: "timed"}
+run_history.import_legacy_high_score(LEGACY_HIGH_SCORE_FILE, MODE_NAMES[FREE_PLAY])
 
 # Constants for grid values
 EMPTY = 0        # Represents an empty cell in the grid
@@ -49,20 +64,18 @@ SPECIAL_FOOD = 3 # Represents special food on the grid
 screen = pygame.display.set_mode((SCREEN_SIZE, SCREEN_SIZE))
 pygame.display.set_caption("AI Snake Game")
 
+spectators = SpectatorServer(port=SPECTATOR_PORT) if SPECTATOR_PORT else None
+
 # Clock for controlling the game's frame rate
 clock = pygame.time.Clock()
 
-def load_high_score():
-    """Load high score from a file."""
-    if os.path.exists(HIGH_SCORE_FILE):
-        with open(HIGH_SCORE_FILE, 'r') as file:
-            return int(file.read().strip())
-    return 0
+def load_high_score(mode=FREE_PLAY):
+    """Load the best recorded score for a game mode."""
+    return run_history.best_score(MODE_NAMES[mode])
 
-def save_high_score(score):
-    """Save high score to a file."""
-    with open(HIGH_SCORE_FILE, 'w') as file:
-        file.write(str(score))
+def record_run(mode, score, length, duration_ms, seed):
+    """Queue a finished game for the run history."""
+    run_history.record(MODE_NAMES[mode], score, length, duration_ms, seed=seed, controller="human")
 
 # Snake class to manage the snake's properties and movement
 class Snake:
@@ -113,19 +126,21 @@ class SpecialFood:
     def __init__(self):
         self.position = None
         self.active = False
-        self.spawn_time = 0
-        self.lifetime = 100  # Special food appears for a limited time (e.g., 100 frames)
+        self.lifetime = 100  # Special food appears for a limited time (100 ticks)
+        self.expiry = None  # Scheduled event that removes the special food
 
-    def spawn(self):
+    def spawn(self, scheduler):
         self.position = (random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1))
         self.active = True
-        self.spawn_time = pygame.time.get_ticks()  # Record when the special food spawns
+        self.expiry = scheduler.schedule(self.lifetime, self.expire)
 
-    def update(self):
-        if self.active:
-            # Remove the special food if its lifetime has passed
-            if pygame.time.get_ticks() - self.spawn_time > self.lifetime * 100:
-                self.active = False
+    def expire(self):
+        self.active = False
+        self.expiry = None
+
+    def eat(self, scheduler):
+        scheduler.cancel(self.expiry)  # Eaten before its lifetime ran out
+        self.expire()
 
     def draw(self):
         if self.active:
@@ -133,32 +148,63 @@ class SpecialFood:
             pygame.draw.rect(screen, YELLOW, pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
 
 class Barrier:
+    """A barrier sliding back and forth along its row, one cell per tick.
+
+    The position isn't stepped every tick; it follows from the tick and the
+    last turnaround (anchor_x at anchor_tick), so only turnarounds need work.
+    """
     def __init__(self, start_pos, end_pos):
         self.start_pos = start_pos
         self.end_pos = end_pos
-        self.current_pos = start_pos
-        self.direction = 1  # 1 for moving right/down, -1 for left/up
+        self.direction = 1 if start_pos[0] < end_pos[0] else 0  # 1 for moving right, -1 for left, 0 if no room to move
+        self.anchor_x = start_pos[0]
+        self.anchor_tick = 0
 
-    def move(self):
-        # Move the barrier back and forth
-        if self.current_pos[0] < self.end_pos[0] and self.direction == 1:
-            self.current_pos = (self.current_pos[0] + 1, self.current_pos[1])
-            if self.current_pos[0] == self.end_pos[0]:
-                self.direction = -1
-        elif self.current_pos[0] > self.start_pos[0] and self.direction == -1:
-            self.current_pos = (self.current_pos[0] - 1, self.current_pos[1])
-            if self.current_pos[0] == self.start_pos[0]:
-                self.direction = 1
+    def position(self, tick):
+        return (self.anchor_x + self.direction * (tick - self.anchor_tick), self.start_pos[1])
 
-    def draw(self):
-        x, y = self.current_pos
+    def lane(self):
+        """Key that stays the same until the barrier turns around (see barrier_lanes)."""
+        return (self.start_pos[1], self.direction, self.anchor_x - self.direction * self.anchor_tick)
+
+    def turn(self, tick):
+        self.anchor_x = self.end_pos[0] if self.direction == 1 else self.start_pos[0]
+        self.anchor_tick = tick
+        self.direction = -self.direction
+
+    def draw(self, tick):
+        x, y = self.position(tick)
         pygame.draw.rect(screen, WHITE, pygame.Rect(x * CELL_SIZE, y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
 
+def barrier_lanes(pos, tick):
+    """The lanes a barrier on pos at this tick would be counted in: still, moving right, moving left."""
+    x, y = pos
+    return ((y, 0, x), (y, 1, x - tick), (y, -1, x + tick))
+
+def book_turn(scheduler, turns, lanes, barrier):
+    """Queue the barrier's next turnaround. Barriers turning on the same tick share one event."""
+    due = barrier.anchor_tick + barrier.end_pos[0] - barrier.start_pos[0]
+    turning = turns.get(due)
+    if turning is None:
+        turning = turns[due] = []
+        scheduler.schedule(due - scheduler.tick, turn_barriers, scheduler, turns, lanes, due)
+    turning.append(barrier)
+
+def turn_barriers(scheduler, turns, lanes, tick):
+    """Scheduled event: turn around every barrier that has reached an end of its track."""
+    for barrier in turns.pop(tick):
+        lane = barrier.lane()
+        lanes[lane] -= 1
+        if not lanes[lane]:
+            del lanes[lane]  # Lane keys move with the tick, so an empty one is never used again
+        barrier.turn(tick)
+        lanes[barrier.lane()] += 1
+        book_turn(scheduler, turns, lanes, barrier)
+
 def show_menu():
-    menu_running = True
-    while menu_running:
+    def draw():
         screen.fill(BLACK)
-        font = pygame.font.SysFont(None, 55)
+        font = get_font(55)
 
         # Define menu options
         options = [
@@ -172,77 +218,134 @@ def show_menu():
             rendered_text = font.render(text, True, WHITE)
             screen.blit(rendered_text, (position[0] - rendered_text.get_width() // 2, position[1]))
 
-        pygame.display.flip()
+    def handle(event):
+        if event.type == pygame.QUIT:
+            return None
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_1:
+                return FREE_PLAY
+            if event.key == pygame.K_2:
+                return TIMED_MODE
+        return STAY
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                menu_running = False
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_1:
-                    game_loop(FREE_PLAY)  # Start game in Free-Play mode
-                    menu_running = False
-                elif event.key == pygame.K_2:
-                    game_loop(TIMED_MODE)  # Start game in Timed mode
-                    menu_running = False
+    mode = run_screen(draw, handle)
+    if mode is not None:
+        game_loop(mode)  # Start game in the chosen mode
 
 
 # Function to show game over screen
 def game_over(score, high_score):
-    screen.fill(BLACK)
-    font = pygame.font.SysFont(None, 55)
-    game_over_text = font.render("Game Over!", True, WHITE)
-    score_text = font.render(f"Your Score: {score}", True, WHITE)
-    high_score_text = font.render(f"High Score: {high_score}", True, WHITE)
-    restart_text = font.render("Press R to Restart", True, WHITE)
-    quit_text = font.render("Press Q to Quit", True, WHITE)
-
-    screen.blit(game_over_text, (GRID_SIZE * CELL_SIZE // 2 - game_over_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 3))
-    screen.blit(score_text, (GRID_SIZE * CELL_SIZE // 2 - score_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 2))
-    screen.blit(high_score_text, (GRID_SIZE * CELL_SIZE // 2 - high_score_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 2 // 3))
-    screen.blit(restart_text, (GRID_SIZE * CELL_SIZE // 2 - restart_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 5 // 6))
-    screen.blit(quit_text, (GRID_SIZE * CELL_SIZE // 2 - quit_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 5 // 6+40))
-    
-    pygame.display.flip()
-    pygame.mixer.music.stop()  # Stop background music
-    game_over_sound.play()  # Play game over sound
+    def draw():
+        screen.fill(BLACK)
+        font = get_font(55)
+        game_over_text = font.render("Game Over!", True, WHITE)
+        score_text = font.render(f"Your Score: {score}", True, WHITE)
+        high_score_text = font.render(f"High Score: {high_score}", True, WHITE)
+        restart_text = font.render("Press R to Restart", True, WHITE)
+        quit_text = font.render("Press Q to Quit", True, WHITE)
+
+        screen.blit(game_over_text, (GRID_SIZE * CELL_SIZE // 2 - game_over_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 3))
+        screen.blit(score_text, (GRID_SIZE * CELL_SIZE // 2 - score_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 2))
+        screen.blit(high_score_text, (GRID_SIZE * CELL_SIZE // 2 - high_score_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 2 // 3))
+        screen.blit(restart_text, (GRID_SIZE * CELL_SIZE // 2 - restart_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 5 // 6))
+        screen.blit(quit_text, (GRID_SIZE * CELL_SIZE // 2 - quit_text.get_width() // 2, GRID_SIZE * CELL_SIZE * 5 // 6+40))
+
+    def handle(event):
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            exit()
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r:  # Press R to restart
+                return True
+            elif event.key == pygame.K_q:  # Press Q to quit
+                pygame.quit()
+                exit()
+        return STAY
+
+    if pygame.mixer.get_init():  # No mixer when there's no audio device
+        pygame.mixer.music.stop()  # Stop background music
 
     # # Wait for a few seconds before quitting
     # pygame.time.delay(2000)  # Delay for 2 seconds
     # pygame.quit()
 
-    waiting_for_restart = True
-    while waiting_for_restart:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_r:  # Press R to restart
-                    waiting_for_restart = False
-                    show_menu()  # Restart the game
-                elif event.key == pygame.K_q:  # Press Q to quit
-                    pygame.quit()
-                    exit()
+    if run_screen(draw, handle):
+        show_menu()  # Restart the game
+
+def pause():
+    """Wait for P to resume the game. Returns False if the window was closed instead."""
+    def draw():
+        screen.fill(BLACK)
+        pause_text = get_font(35).render("Game Paused", True, WHITE)
+        screen.blit(pause_text, (GRID_SIZE * CELL_SIZE // 2 - pause_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 2))
+
+    def handle(event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+            return True
+        if event.type == pygame.QUIT:
+            return False
+        return STAY
+
+    return run_screen(draw, handle)
 
 # Main game loop 
 def game_loop(mode=FREE_PLAY):
+    seed = random.randrange(2 ** 32)  # Seed the run so it can be replayed
+    random.seed(seed)
     snake = Snake()
     food = Food()
     special_food = SpecialFood()
     barriers = []  # No barriers in free-play mode, add them in timed or AI mode
+    barrier_cells = Counter()  # Number of barriers in each lane, see barrier_lanes()
+    barrier_turns = {}  # Tick -> barriers turning around on it
+    scheduler = Scheduler()  # Timed events, keyed on game ticks
+    events = EventQueue()  # Sounds to play on the next frame
     running = True
     score = 0
-    high_score = load_high_score()  # Load high score from file
-    special_food_spawn_interval = 5000  # Spawn special food every 5 seconds
+    high_score = load_high_score(mode)  # Best score recorded for this mode
+    special_food_spawn_interval = 50  # Spawn special food every 50 ticks (5 seconds at the initial speed)
     level = 1
     speed = 10  # Initial speed
     start_time = pygame.time.get_ticks()  # Record the start time for timed mode
     game_duration = 60000  # 60 seconds for timed mode
 
+    def spawn_special_food():
+        if not special_food.active:
+            special_food.spawn(scheduler)
+        scheduler.schedule(special_food_spawn_interval, spawn_special_food)
+
+    def add_barrier(barrier):
+        barriers.append(barrier)
+        barrier.anchor_tick = scheduler.tick
+        barrier_cells[barrier.lane()] += 1
+        if barrier.direction:
+            book_turn(scheduler, barrier_turns, barrier_cells, barrier)
+
+    def level_up():
+        nonlocal level, speed
+        level += 1
+        speed += 2  # Increase snake speed
+        add_barrier(Barrier((random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)),
+                            (random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1))))  # Add a new barrier
+        if score > level * 5:  # Still past the next threshold, level up again next tick
+            scheduler.schedule(1, level_up)
+
+    def add_points(points):
+        nonlocal score
+        level_up_pending = score > level * 5
+        score += points
+        # Increase difficulty every 5 points in timed mode
+        if mode == TIMED_MODE and not level_up_pending and score > level * 5:
+            scheduler.schedule(0, level_up)
+
+    scheduler.schedule(special_food_spawn_interval, spawn_special_food)
+    if spectators:
+        spectators.reset()  # New board: spectators get a keyframe
+
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                game_over_sound.play()  # Play game over sound
+                events.emit(GAME_OVER)
                 running = False
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
@@ -254,57 +357,38 @@ def game_loop(mode=FREE_PLAY):
                 elif event.key == pygame.K_RIGHT:
                     snake.change_direction(RIGHT)
                 elif event.key == pygame.K_p:  # Pause
-                    paused = True
-                    while paused:
-                        for pause_event in pygame.event.get():
-                            if pause_event.type == pygame.KEYDOWN and pause_event.key == pygame.K_p:
-                                paused = False
-                            elif pause_event.type == pygame.QUIT:
-                                paused = False
-                        screen.fill(BLACK)
-                        pause_text = font.render("Game Paused", True, WHITE)
-                        screen.blit(pause_text, (GRID_SIZE * CELL_SIZE // 2 - pause_text.get_width() // 2, GRID_SIZE * CELL_SIZE // 2))
-                        pygame.display.flip()
+                    if not pause():
+                        events.emit(GAME_OVER)  # Window closed while paused
+                        running = False
 
         snake.move()
 
-        # Spawn special food at intervals
-        if pygame.time.get_ticks() % special_food_spawn_interval < 50 and not special_food.active:
-            special_food.spawn()
-
-        # Update special food lifetime
-        special_food.update()
-
-        # Move barriers in timed mode
-        if mode == TIMED_MODE:
-            for barrier in barriers:
-                barrier.move()
+        # Fire the events due this tick: special food spawns and expiries, barrier turnarounds, level-ups
+        scheduler.advance()
 
         # Check if snake eats the food
         if snake.body[0] == food.position:
             snake.grow()
-            score += 1
-            eat_sound.play()  # Play eat sound
+            add_points(1)
+            events.emit(ATE)
             food = Food()  # Spawn new food
 
         # Check if snake eats the special food
         if special_food.active and snake.body[0] == special_food.position:
             snake.grow()
             snake.grow()  # Snake grows by 2 units
-            score += 5  # Higher score for special food
-            eat_special_sound.play()  # Play eat sound
-            special_food.active = False  # Remove special food after eating
+            add_points(5)  # Higher score for special food
+            events.emit(SPECIAL_ATE)
+            special_food.eat(scheduler)  # Remove special food after eating
 
-        # Check for collisions with barriers in timed mode
-        if mode == TIMED_MODE:
-            for barrier in barriers:
-                if snake.body[0] == barrier.current_pos:
-                    game_over_sound.play()  # Play game over sound
-                    running = False
+        # Check for collisions with barriers
+        if any(barrier_cells[lane] for lane in barrier_lanes(snake.body[0], scheduler.tick)):
+            events.emit(GAME_OVER)
+            running = False
 
         # Check for collisions
         if snake.check_collision():
-            game_over_sound.play()  # Play game over sound
+            events.emit(GAME_OVER)
             running = False
 
         # Draw everything
@@ -317,10 +401,10 @@ def game_loop(mode=FREE_PLAY):
         # Draw barriers in timed mode
         if mode == TIMED_MODE:
             for barrier in barriers:
-                barrier.draw()
+                barrier.draw(scheduler.tick)
 
         # Display the score
-        font = pygame.font.SysFont(None, 35)
+        font = get_font(35)
         score_text = font.render(f"Score: {score}", True, WHITE)
         high_score_text = font.render(f"High Score: {high_score}", True, WHITE)
         screen.blit(score_text, (5, 5))
@@ -333,24 +417,23 @@ def game_loop(mode=FREE_PLAY):
             timer_text = font.render(f"Time Left: {remaining_time:.1f}s", True, WHITE)
             screen.blit(timer_text, (SCREEN_SIZE - 150, 10))  # Positioning at the top right
 
-        # Increase difficulty
-        if mode == TIMED_MODE and score > level * 5:  # Increase difficulty every 5 points
-            level += 1
-            speed += 2  # Increase snake speed
-            barriers.append(Barrier((random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1)),
-                                    (random.randint(0, GRID_SIZE - 1), random.randint(0, GRID_SIZE - 1))))  # Add a new barrier
-
         # End timed mode after duration
         if mode == TIMED_MODE and pygame.time.get_ticks() - start_time > game_duration:
+            events.emit(GAME_OVER)
             running = False
 
+        audio.play(events)  # Sounds raised since the last frame
+        if spectators and running:  # The head may be off the board once the game is over
+            foods = [food.position] + ([special_food.position] if special_food.active else [])
+            spectators.publish(GRID_SIZE, GRID_SIZE, snake.body, foods, [barrier.position(scheduler.tick) for barrier in barriers])
         pygame.display.flip()
         clock.tick(speed)  # Control the speed of the snake
     
+    record_run(mode, score, len(snake.body), pygame.time.get_ticks() - start_time, seed)
+
     # Check if current score is higher than the high score
     if score > high_score:
         high_score = score
-        save_high_score(high_score)  # Save the new high score
     
     game_over(score, high_score)  # Show the game over screen with the score
 
@@ -0,0 +1,83 @@
+import random
+
+from distance_field import DistanceField
+from pathfinding import is_free
+
+# Directions
+UP, DOWN, LEFT, RIGHT = (0, -1), (0, 1), (-1, 0), (1, 0)
+
+
+class HeadlessGame:
+    """The AI game's board and rules without pygame, for fast seeded runs.
+
+    ai_snake.Snake builds on this class, so the game, tuning.py and
+    qlearning.py all play by the same rules, and a seed gives the same board in
+    each. The caller decides every move; walking into a wall, a mine or the
+    snake's own body ends the game.
+    """
+
+    def __init__(self, seed=None, grid_size=20, mines=10, start=(5, 5)):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.grid_size = grid_size
+        self.body = [start]
+        self.direction = DOWN
+        self.barriers = self.create_barriers(mines)
+        self.grid = [[0] * grid_size for _ in range(grid_size)]
+        for x, y in self.body + self.barriers:
+            self.grid[x][y] = 1
+        self.food_pos = self.spawn_food()
+        self.field = DistanceField(grid_size, grid_size, goal=self.food_pos, blocked=self.body + self.barriers)
+        self.alive = True
+        self.score = 0  # Food eaten
+        self.steps = 0
+
+    def create_barriers(self, mines):
+        barriers = []
+        while len(barriers) < mines:
+            pos = (self.rng.randint(0, self.grid_size - 1), self.rng.randint(0, self.grid_size - 1))
+            if pos not in self.body and pos not in barriers:
+                barriers.append(pos)
+        return barriers
+
+    def spawn_food(self):
+        """Place food on a random free cell, or return None if the board is full."""
+        if len(self.body) + len(self.barriers) >= self.grid_size * self.grid_size:
+            return None
+        while True:
+            pos = (self.rng.randint(0, self.grid_size - 1), self.rng.randint(0, self.grid_size - 1))
+            if self.grid[pos[0]][pos[1]] == 0:
+                return pos
+
+    def is_free(self, pos):
+        return is_free(self.grid, *pos)
+
+    def free_moves(self):
+        """Neighbouring cells the head can move into."""
+        head_x, head_y = self.body[0]
+        return [(head_x + dx, head_y + dy) for dx, dy in (UP, DOWN, LEFT, RIGHT) if self.is_free((head_x + dx, head_y + dy))]
+
+    def step(self, pos):
+        """Move the head to a neighbouring cell. Returns False if the move ended the game."""
+        if not self.alive:
+            return False
+        self.steps += 1
+        if pos is None or not self.is_free(pos):
+            self.alive = False
+            return False
+        self.direction = (pos[0] - self.body[0][0], pos[1] - self.body[0][1])
+        self.body.insert(0, pos)
+        self.grid[pos[0]][pos[1]] = 1
+        self.field.block(pos)
+        if pos == self.food_pos:
+            self.score += 1
+            self.food_pos = self.spawn_food()
+            if self.food_pos is None:
+                self.alive = False  # The snake filled the board
+                return False
+            self.field.set_goal(self.food_pos)
+        else:
+            tail = self.body.pop()
+            self.grid[tail[0]][tail[1]] = 0
+            self.field.unblock(tail)
+        return True
@@ -0,0 +1,107 @@
+import json
+import os
+
+from distance_field import UNREACHABLE
+
+# Best weights found by tuning.py, loaded by ai_snake.Snake
+AI_WEIGHTS_FILE = "stats/ai_weights.json"
+
+# Terms of the move score, each computed for the cell the head would move into
+FEATURES = (
+    "food_distance",   # Steps to the food along the distance field (A*'s g cost)
+    "food_heuristic",  # Squared straight-line distance to the food (A*'s h cost)
+    "free_area",       # Share of the free cells still reachable after the move
+    "tail_reachable",  # 1 if the snake can still reach its own tail after the move
+    "wall_proximity",  # Number of sides touching the edge of the board
+    "mine_proximity",  # Number of sides touching a mine
+)
+
+# Hand-picked starting point: head for the food but avoid boxing yourself in
+DEFAULT_WEIGHTS = {
+    "food_distance": -1.0,
+    "food_heuristic": 0.0,
+    "free_area": 20.0,
+    "tail_reachable": 10.0,
+    "wall_proximity": -0.5,
+    "mine_proximity": -0.5,
+}
+
+
+def load_weights(path=AI_WEIGHTS_FILE):
+    """Load a weight set written by tuning.py, or return None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        data = json.load(file)
+    return {name: float(data["weights"].get(name, 0.0)) for name in FEATURES}
+
+
+def save_weights(weights, path=AI_WEIGHTS_FILE, **info):
+    """Write a weight set (plus any extra info, e.g. its fitness) for the game to load."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(dict(info, weights=weights), file, indent=2)
+    os.replace(temp_path, path)  # Never leave a half-written file behind
+
+
+def move_features(board, pos):
+    """Feature values for moving the head of board (an ai_snake.Snake or HeadlessGame) to pos."""
+    grid = board.grid
+    width, height = len(grid), len(grid[0])
+    food = board.food_pos
+    eating = pos == food
+
+    distance = board.field.distance(pos)
+    if distance == UNREACHABLE:
+        distance = width * height
+
+    # Flood fill the board as it will be after the move: the head takes pos and,
+    # unless the snake eats, the tail moves off its cell
+    if eating:
+        tail, freed = board.body[-1], None
+    else:
+        tail, freed = (board.body[-2] if len(board.body) > 1 else pos), board.body[-1]
+    seen = {pos}
+    stack = [pos]
+    tail_reachable = tail == pos
+    while stack:
+        x, y = stack.pop()
+        for n in ((x, y - 1), (x, y + 1), (x - 1, y), (x + 1, y)):
+            if n == tail:
+                tail_reachable = True
+            if (n not in seen and 0 <= n[0] < width and 0 <= n[1] < height and
+                    (grid[n[0]][n[1]] == 0 or n == freed)):
+                seen.add(n)
+                stack.append(n)
+    free_cells = width * height - len(board.body) - len(board.barriers)
+
+    walls = (pos[0] == 0) + (pos[0] == width - 1) + (pos[1] == 0) + (pos[1] == height - 1)
+    barriers = board.barriers
+    mines = sum(n in barriers for n in ((pos[0], pos[1] - 1), (pos[0], pos[1] + 1), (pos[0] - 1, pos[1]), (pos[0] + 1, pos[1])))
+
+    return {
+        "food_distance": distance,
+        "food_heuristic": (food[0] - pos[0]) ** 2 + (food[1] - pos[1]) ** 2 if food else 0,
+        "free_area": (len(seen) - 1) / max(free_cells, 1),
+        "tail_reachable": 1.0 if tail_reachable else 0.0,
+        "wall_proximity": walls,
+        "mine_proximity": mines,
+    }
+
+
+def score_move(board, pos, weights):
+    features = move_features(board, pos)
+    return sum(weights[name] * features[name] for name in FEATURES)
+
+
+def choose_move(board, weights):
+    """Return the free neighbour of the head with the best weighted score, or None if boxed in."""
+    best, best_score = None, None
+    for pos in board.free_moves():
+        score = score_move(board, pos, weights)
+        if best_score is None or score > best_score:
+            best, best_score = pos, score
+    return best
@@ -0,0 +1,180 @@
+import heapq
+import random
+import time
+
+# Directions
+UP, DOWN, LEFT, RIGHT = (0, -1), (0, 1), (-1, 0), (1, 0)
+DIRECTIONS = [UP, DOWN, LEFT, RIGHT]
+
+
+def is_free(grid, x, y):
+    """True if (x, y) is inside the grid and not an obstacle. Grids are indexed grid[x][y]."""
+    return 0 <= x < len(grid) and 0 <= y < len(grid[0]) and grid[x][y] == 0
+
+
+def manhattan(a, b):
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+def reconstruct(parents, goal):
+    path = []
+    position = goal
+    while position is not None:
+        path.append(position)
+        position = parents[position]
+    return path[::-1]
+
+
+def astar(start, goal, grid, stats=None):
+    """Optimal A* on a 4-connected grid.
+
+    Returns the path from start to goal as a list of positions (including both
+    ends), or [] if there is none. If a stats dict is given, the number of
+    expanded nodes is stored in stats['expanded'].
+    """
+    open_heap = [(manhattan(start, goal), 0, start)]
+    costs = {start: 0}
+    parents = {start: None}
+    expanded = 0
+    path = []
+
+    while open_heap:
+        _, cost, position = heapq.heappop(open_heap)
+        if cost > costs[position]:
+            continue  # Stale entry, a cheaper route was found later
+        expanded += 1
+        if position == goal:
+            path = reconstruct(parents, goal)
+            break
+        for dx, dy in DIRECTIONS:
+            neighbour = (position[0] + dx, position[1] + dy)
+            if is_free(grid, *neighbour) and cost + 1 < costs.get(neighbour, cost + 2):
+                costs[neighbour] = cost + 1
+                parents[neighbour] = position
+                heapq.heappush(open_heap, (cost + 1 + manhattan(neighbour, goal), cost + 1, neighbour))
+
+    if stats is not None:
+        stats['expanded'] = expanded
+    return path
+
+
+def jump(grid, x, y, dx, dy, goal):
+    """Walk from (x, y) in direction (dx, dy) and return the next jump point, or None."""
+    while True:
+        x += dx
+        y += dy
+        if not is_free(grid, x, y):
+            return None
+        if (x, y) == goal:
+            return (x, y)
+        if dx:
+            # Moving horizontally: stop where a wall beside us ends (forced neighbour)
+            if ((is_free(grid, x, y - 1) and not is_free(grid, x - dx, y - 1)) or
+                    (is_free(grid, x, y + 1) and not is_free(grid, x - dx, y + 1))):
+                return (x, y)
+        else:
+            if ((is_free(grid, x - 1, y) and not is_free(grid, x - 1, y - dy)) or
+                    (is_free(grid, x + 1, y) and not is_free(grid, x + 1, y - dy))):
+                return (x, y)
+            # Moving vertically: stop wherever a horizontal jump would find something
+            if jump(grid, x, y, 1, 0, goal) or jump(grid, x, y, -1, 0, goal):
+                return (x, y)
+
+
+def pruned_directions(position, parent):
+    """Directions worth exploring from a jump point, given the one it was reached from."""
+    if parent is None:
+        return DIRECTIONS
+    dx = (position[0] > parent[0]) - (position[0] < parent[0])
+    dy = (position[1] > parent[1]) - (position[1] < parent[1])
+    if dx:
+        return [(dx, 0), UP, DOWN]
+    return [(0, dy), LEFT, RIGHT]
+
+
+def jps(start, goal, grid, stats=None):
+    """Jump Point Search on a 4-connected grid.
+
+    Finds paths of the same length as an optimal A* but only expands jump
+    points, which skips the long straight runs of open boards. Takes the same
+    arguments and returns the same full path list as astar().
+    """
+    open_heap = [(manhattan(start, goal), 0, start)]
+    costs = {start: 0}
+    parents = {start: None}
+    expanded = 0
+    path = []
+
+    while open_heap:
+        _, cost, position = heapq.heappop(open_heap)
+        if cost > costs[position]:
+            continue
+        expanded += 1
+        if position == goal:
+            # Fill in the straight segments between consecutive jump points
+            points = reconstruct(parents, goal)
+            path = [points[0]]
+            for (x, y), (nx, ny) in zip(points, points[1:]):
+                dx = (nx > x) - (nx < x)
+                dy = (ny > y) - (ny < y)
+                while (x, y) != (nx, ny):
+                    x, y = x + dx, y + dy
+                    path.append((x, y))
+            break
+        for dx, dy in pruned_directions(position, parents[position]):
+            point = jump(grid, position[0], position[1], dx, dy, goal)
+            if point is None:
+                continue
+            new_cost = cost + manhattan(position, point)
+            if new_cost < costs.get(point, new_cost + 1):
+                costs[point] = new_cost
+                parents[point] = position
+                heapq.heappush(open_heap, (new_cost + manhattan(point, goal), new_cost, point))
+
+    if stats is not None:
+        stats['expanded'] = expanded
+    return path
+
+
+def random_board(seed, size=20, mines=10, start=(5, 5)):
+    """Seeded board laid out like Snake.create_barriers(): returns (grid, start, goal)."""
+    rng = random.Random(seed)
+    barriers = set()
+    while len(barriers) < mines:
+        pos = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+        if pos != start:
+            barriers.add(pos)
+    while True:
+        goal = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+        if goal != start and goal not in barriers:
+            break
+    grid = [[0] * size for _ in range(size)]
+    for x, y in barriers:
+        grid[x][y] = 1
+    grid[start[0]][start[1]] = 1  # The snake's head
+    return grid, start, goal
+
+
+def compare(seeds, size=20, mines=10):
+    """Run A* and JPS on the same seeded boards and return their totals."""
+    totals = {'astar': [0, 0.0], 'jps': [0, 0.0]}
+    for seed in seeds:
+        grid, start, goal = random_board(seed, size, mines)
+        lengths = []
+        for name, finder in (('astar', astar), ('jps', jps)):
+            stats = {}
+            began = time.perf_counter()
+            lengths.append(len(finder(start, goal, grid, stats)))
+            totals[name][0] += stats['expanded']
+            totals[name][1] += time.perf_counter() - began
+        if lengths[0] != lengths[1]:
+            raise AssertionError(f"Path lengths differ on seed {seed}: {lengths}")
+    return totals
+
+
+if __name__ == "__main__":
+    for size, mines in ((20, 10), (100, 250), (300, 2000)):
+        totals = compare(range(50), size, mines)
+        print(f"{size}x{size} board, {mines} mines, 50 seeds:")
+        for name, (expanded, seconds) in totals.items():
+            print(f"  {name:5} {expanded:9} nodes expanded  {seconds * 1000:9.1f} ms")
@@ -0,0 +1,168 @@
+import argparse
+import os
+import random
+from multiprocessing import Pool
+
+import numpy as np
+
+from headless import DOWN, LEFT, RIGHT, UP, HeadlessGame
+
+# Trained table, loaded by QPolicy.load()
+Q_TABLE_FILE = "stats/q_table.npy"
+
+# Actions are absolute moves, in this order
+ACTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# 4 danger bits x 9 food directions x 4 headings
+STATE_COUNT = 16 * 9 * 4
+
+# Rewards
+FOOD_REWARD = 10.0
+DEATH_REWARD = -10.0
+STEP_REWARD = -0.01  # Small cost per move so the snake doesn't dawdle
+
+
+def heading(board):
+    """Direction the snake last moved in (the arrow keys in ai_snake.py can change .direction between moves)."""
+    if len(board.body) > 1:
+        (hx, hy), (nx, ny) = board.body[0], board.body[1]
+        return (hx - nx, hy - ny)
+    return board.direction
+
+
+def encode_state(board):
+    """Pack danger bits for each direction, the food's direction and the heading into one index."""
+    head_x, head_y = board.body[0]
+    danger = 0
+    for i, (dx, dy) in enumerate(ACTIONS):
+        if not board.is_free((head_x + dx, head_y + dy)):
+            danger |= 1 << i
+    food_x, food_y = board.food_pos
+    food = ((food_x > head_x) - (food_x < head_x) + 1) * 3 + (food_y > head_y) - (food_y < head_y) + 1
+    return (danger * 9 + food) * 4 + ACTIONS.index(heading(board))
+
+
+class QPolicy:
+    """Greedy controller over a trained Q-table: one table lookup per move."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @classmethod
+    def load(cls, path=Q_TABLE_FILE):
+        """Load a table written by train(). Raises FileNotFoundError if there isn't one."""
+        return cls(np.load(path))
+
+    def choose_move(self, board):
+        """Best-valued move that doesn't walk into danger, or None if every side is blocked."""
+        state = encode_state(board)
+        danger = state // 36
+        values = self.table[state]
+        best = None
+        for action in range(len(ACTIONS)):
+            if not danger & (1 << action) and (best is None or values[action] > values[best]):
+                best = action
+        if best is None:
+            return None
+        head_x, head_y = board.body[0]
+        return (head_x + ACTIONS[best][0], head_y + ACTIONS[best][1])
+
+
+def train_worker(task):
+    """Run epsilon-greedy episodes on a copy of the table; return it with per-entry update counts."""
+    table, seed, episodes, epsilon, alpha, gamma, mines = task
+    rng = random.Random(seed)
+    visits = np.zeros(table.shape, dtype=np.int64)
+    for _ in range(episodes):
+        # The classic game's rules: start mid-board heading right, die on walls
+        game = HeadlessGame(rng.randrange(2 ** 32), mines=mines, start=(10, 10))
+        game.direction = RIGHT
+        stall_limit = 2 * game.grid_size * game.grid_size
+        last_meal = 0
+        state = encode_state(game)
+        while game.alive and game.steps - last_meal < stall_limit:
+            if rng.random() < epsilon:
+                action = rng.randrange(len(ACTIONS))
+            else:
+                action = int(np.argmax(table[state]))
+            head_x, head_y = game.body[0]
+            score = game.score
+            game.step((head_x + ACTIONS[action][0], head_y + ACTIONS[action][1]))
+            if not game.alive:
+                reward, target = DEATH_REWARD, DEATH_REWARD
+            else:
+                if game.score != score:
+                    reward, last_meal = FOOD_REWARD, game.steps
+                else:
+                    reward = STEP_REWARD
+                next_state = encode_state(game)
+                target = reward + gamma * table[next_state].max()
+            table[state, action] += alpha * (target - table[state, action])
+            visits[state, action] += 1
+            if game.alive:
+                state = next_state
+    return table, visits
+
+
+def merge(base, results):
+    """Average the workers' tables, weighting each entry by how often that worker updated it."""
+    total = np.zeros(base.shape)
+    counts = np.zeros(base.shape)
+    for table, visits in results:
+        total += table * visits
+        counts += visits
+    return np.where(counts > 0, total / np.maximum(counts, 1), base).astype(base.dtype)
+
+
+def train(rounds=20, episodes=500, processes=None, seed=0, epsilon=0.2, epsilon_decay=0.85,
+          alpha=0.1, gamma=0.9, mines=0, output=Q_TABLE_FILE):
+    """Train a Q-table on headless games, merging the workers' tables after every round."""
+    processes = processes or os.cpu_count()
+    table = np.load(output) if os.path.exists(output) else np.zeros((STATE_COUNT, len(ACTIONS)), dtype=np.float32)
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with Pool(processes) as pool:
+        for round_number in range(rounds):
+            tasks = [(table.copy(), seed * 1000003 + round_number * processes + worker, episodes,
+                      epsilon, alpha, gamma, mines) for worker in range(processes)]
+            table = merge(table, pool.map(train_worker, tasks))
+            np.save(output, table)  # Keep the latest table even if training is interrupted
+            print(f"Round {round_number}: epsilon {epsilon:.3f}, "
+                  f"{np.count_nonzero(table.any(axis=1))} of {STATE_COUNT} states seen")
+            epsilon *= epsilon_decay
+    return table
+
+
+def evaluate(policy, games=20, mines=10, max_steps=5000):
+    """Mean food eaten by a policy on seeded games with the AI game's mines."""
+    total = 0
+    for seed in range(games):
+        game = HeadlessGame(seed, mines=mines)
+        while game.alive and game.steps < max_steps:
+            game.step(policy.choose_move(game))
+        total += game.score
+    return total / games
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train a tabular Q-learning controller on headless games.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--episodes", type=int, default=500, help="episodes per worker per round")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mines", type=int, default=0, help="mines on the training boards (the classic game has none)")
+    parser.add_argument("--output", default=Q_TABLE_FILE)
+    parser.add_argument("--play", action="store_true", help="play the AI game with the table in --output instead of training")
+    args = parser.parse_args()
+    if args.play:
+        try:
+            policy = QPolicy.load(args.output)
+        except FileNotFoundError:
+            parser.exit(1, f"No Q-table at {args.output}; train one first with python qlearning.py\n")
+        import ai_snake  # Opens the game window
+        ai_snake.main(policy=policy)
+    else:
+        table = train(args.rounds, args.episodes, args.processes, args.seed, mines=args.mines, output=args.output)
+        print(f"Mean food eaten on the AI game's boards: {evaluate(QPolicy(table)):.1f}")
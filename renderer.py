@@ -0,0 +1,133 @@
+import os
+import subprocess
+
+import pygame
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for array observations
+    np = None
+
+# Sprites used by the AI game (ai_snake.py)
+HEAD_IMAGE = 'img/head.png'
+BODY_IMAGE = 'img/bodyf.png'
+FOOD_IMAGE = 'img/food.png'
+BARRIER_IMAGE = 'img/mine.png'
+BACKGROUND_COLOR = (0, 0, 0)
+
+# Byte order R, G, B, X on little-endian machines, matching ffmpeg's rgb0 input
+PIXEL_MASKS = (0xFF, 0xFF00, 0xFF0000, 0)
+
+
+class BoardRenderer:
+    """Draws boards into a reusable offscreen surface, without a display.
+
+    A board is anything with ``body``, ``food_pos`` and ``barriers`` attributes,
+    such as ``ai_snake.Snake``. The same surface is redrawn for every frame, so
+    rendering many boards or a long run allocates nothing per frame.
+    """
+
+    def __init__(self, grid_width=20, grid_height=20, cell_size=20):
+        self.grid_width = grid_width
+        self.grid_height = grid_height
+        self.cell_size = cell_size
+        self.size = (grid_width * cell_size, grid_height * cell_size)
+        self.surface = pygame.Surface(self.size, 0, 32, PIXEL_MASKS)
+
+        size = (cell_size, cell_size)
+        self.head_img = self._load(HEAD_IMAGE, size)
+        self.body_img = self._load(BODY_IMAGE, size)
+        self.food_img = self._load(FOOD_IMAGE, size)
+        self.barrier_img = self._load(BARRIER_IMAGE, size)
+
+    @staticmethod
+    def _load(path, size):
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        if pygame.display.get_surface() is not None:  # convert_alpha() needs a window
+            image = image.convert_alpha()  # Match the window's pixel format for faster blits
+        return image
+
+    def draw(self, target, board):
+        """Draw a board onto any surface, e.g. the offscreen one or a window."""
+        cell = self.cell_size
+        target.fill(BACKGROUND_COLOR)
+        for i, (x, y) in enumerate(board.body):
+            target.blit(self.head_img if i == 0 else self.body_img, (x * cell, y * cell))
+        if board.food_pos:
+            target.blit(self.food_img, (board.food_pos[0] * cell, board.food_pos[1] * cell))
+        for x, y in board.barriers:
+            target.blit(self.barrier_img, (x * cell, y * cell))
+
+    def render(self, board):
+        """Draw a board into the offscreen surface and return it."""
+        self.draw(self.surface, board)
+        return self.surface
+
+    def to_array(self, out=None):
+        """Copy the current frame into an (height, width, 3) uint8 array."""
+        if np is None:
+            raise RuntimeError("numpy is required for array observations")
+        if out is None:
+            out = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        pixels = pygame.surfarray.pixels3d(self.surface)  # (width, height, 3) view, no copy
+        out[...] = pixels.transpose(1, 0, 2)
+        del pixels  # Unlock the surface
+        return out
+
+    def render_batch(self, boards, out=None):
+        """Render several boards into one (n, height, width, 3) uint8 array.
+
+        Pass the same ``out`` array every step to avoid reallocating it.
+        """
+        if np is None:
+            raise RuntimeError("numpy is required for array observations")
+        if out is None:
+            out = np.empty((len(boards), self.size[1], self.size[0], 3), dtype=np.uint8)
+        for i, board in enumerate(boards):
+            self.render(board)
+            self.to_array(out[i])
+        return out
+
+
+class PNGSequenceWriter:
+    """Saves each frame as a numbered PNG file."""
+
+    def __init__(self, directory, pattern='frame_{:06d}.png'):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.pattern = pattern
+        self.frame = 0
+
+    def write(self, surface):
+        pygame.image.save(surface, os.path.join(self.directory, self.pattern.format(self.frame)))
+        self.frame += 1
+
+    def close(self):
+        pass
+
+
+class VideoWriter:
+    """Streams raw frames to an ffmpeg process that encodes them into a video file.
+
+    Frames are handed over straight from the surface's pixel memory, so they
+    are never copied into Python objects. Requires ``ffmpeg`` on the PATH.
+    """
+
+    def __init__(self, path, size, fps=10, ffmpeg='ffmpeg'):
+        self.size = size
+        self.process = subprocess.Popen(
+            [ffmpeg, '-loglevel', 'error', '-y',
+             '-f', 'rawvideo', '-pix_fmt', 'rgb0', '-s', '{}x{}'.format(*size), '-r', str(fps),
+             '-i', '-', '-pix_fmt', 'yuv420p', path],
+            stdin=subprocess.PIPE,
+        )
+
+    def write(self, surface):
+        """Write one frame. The surface must use PIXEL_MASKS, as BoardRenderer.surface does."""
+        view = surface.get_view('0')  # Raw pixel bytes
+        self.process.stdin.write(view)
+        del view  # Unlock the surface
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
@@ -0,0 +1,159 @@
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Local database holding every finished game
+RUN_HISTORY_FILE = "stats/run_history.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    seed INTEGER,
+    controller TEXT NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_leaderboard ON runs (mode, score DESC);
+"""
+
+COLUMNS = ("mode", "score", "length", "duration_ms", "seed", "controller", "finished_at")
+
+INSERT = ("INSERT INTO runs (mode, score, length, duration_ms, seed, controller, finished_at) "
+          "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+logger = logging.getLogger(__name__)
+
+
+class RunHistory:
+    """Append-only store of finished games with a per-mode leaderboard.
+
+    Runs are queued by the game thread and written by a background thread, so
+    recording a game never waits on the disk. Whatever has queued up by the
+    time the writer gets to it (up to batch_size runs) goes in one transaction.
+    The (mode, score) index lets top-N queries walk the leaderboard instead of
+    scanning all runs.
+    """
+
+    def __init__(self, path=RUN_HISTORY_FILE, batch_size=500):
+        self.path = path
+        self.batch_size = batch_size  # Most runs written in one transaction
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # Create the schema up front so queries work before the first write lands
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="run-history-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")  # Readers don't wait for the writer
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def record(self, mode, score, length, duration_ms, seed=None, controller="human"):
+        """Queue a finished game for writing. Returns immediately."""
+        self._queue.put((mode, score, length, duration_ms, seed, controller, time.time()))
+
+    def flush(self):
+        """Block until every queued run has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write any pending runs and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def top(self, mode, n=10):
+        """Return the n best runs for a mode as dicts, highest score first."""
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                "SELECT mode, score, length, duration_ms, seed, controller, finished_at "
+                "FROM runs WHERE mode = ? ORDER BY score DESC LIMIT ?",
+                (mode, n),
+            ).fetchall()
+        finally:
+            connection.close()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def import_legacy_high_score(self, path, mode):
+        """Move a score from the old single-integer high score file into the history.
+
+        The score is stored as one run of the given mode and the file is removed.
+        Empty files are just removed; files that don't hold a number are left alone.
+        """
+        if not os.path.exists(path):
+            return
+        with open(path) as file:
+            text = file.read().strip()
+        if text:
+            try:
+                score = int(text)
+            except ValueError:
+                return
+            self.record(mode, score, 0, 0, controller="legacy")
+            self.flush()  # Make it count towards the high score straight away
+        os.remove(path)
+
+    def best_score(self, mode):
+        """Highest score recorded for a mode, or 0 if it has never been played."""
+        best = self.top(mode, 1)
+        return best[0]["score"] if best else 0
+
+    def _write_loop(self):
+        connection = self._connect()
+        running = True
+        while running:
+            item = self._queue.get()  # Sleep until there's something to write
+            batch = []
+            taken = 1
+            while True:
+                if item is None:
+                    running = False
+                else:
+                    batch.append(item)
+                if not running or len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                    taken += 1
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._write(connection, batch)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()  # Even if the write failed, so flush() never hangs
+        connection.close()
+
+    def _write(self, connection, batch):
+        try:
+            with connection:  # One transaction per batch
+                connection.executemany(INSERT, batch)
+            return
+        except Exception:
+            pass
+        # One bad row fails the whole transaction, so retry the rows one at a
+        # time to keep the good ones. The writer keeps running either way.
+        for row in batch:
+            try:
+                with connection:
+                    connection.execute(INSERT, row)
+            except Exception:
+                logger.exception("Could not record run %r", row)
@@ -0,0 +1,39 @@
+import heapq
+import itertools
+
+
+class Scheduler:
+    """Runs callbacks at future simulation ticks.
+
+    Events live in a min-heap keyed on the tick they are due, so advancing the
+    clock only touches the events that fire on that tick rather than polling
+    every timed entity each frame.
+    """
+
+    def __init__(self):
+        self.tick = 0
+        self._heap = []
+        self._order = itertools.count()  # Keeps events due on the same tick in scheduling order
+
+    def schedule(self, delay, callback, *args):
+        """Run callback(*args) delay ticks from now and return a handle for cancel()."""
+        event = [self.tick + delay, next(self._order), callback, args]
+        heapq.heappush(self._heap, event)
+        return event
+
+    def cancel(self, event):
+        """Stop a scheduled event from firing. Cancelling twice is harmless."""
+        if event is not None:
+            event[2] = None
+
+    def advance(self):
+        """Move the clock forward one tick and fire every event now due."""
+        self.tick += 1
+        heap = self._heap
+        while heap and heap[0][0] <= self.tick:
+            _, _, callback, args = heapq.heappop(heap)
+            if callback is not None:
+                callback(*args)
+
+    def __len__(self):
+        return len(self._heap)
@@ -0,0 +1,34 @@
+from functools import lru_cache
+
+import pygame
+
+# Values a screen's handler returns instead of a result
+STAY = object()    # Nothing changed, keep waiting
+REDRAW = object()  # The screen's state changed, repaint it and keep waiting
+
+
+@lru_cache(maxsize=None)
+def get_font(size):
+    """Default system font at the given size, created once and reused."""
+    return pygame.font.SysFont(None, size)
+
+
+def run_screen(draw, handle, timeout=0):
+    """Show an idle screen (menu, pause, game over) until handle() returns a result.
+
+    The screen is painted once and then the loop blocks in pygame.event.wait(),
+    so nothing runs while the player does nothing. handle(event) returns STAY,
+    REDRAW or the value to return. With a timeout (in milliseconds) the screen
+    is also repainted every time the wait runs out, which is enough for simple
+    animations.
+    """
+    draw()
+    pygame.display.flip()
+    while True:
+        event = pygame.event.wait(timeout)
+        result = REDRAW if event.type == pygame.NOEVENT else handle(event)
+        if result is REDRAW:
+            draw()
+            pygame.display.flip()
+        elif result is not STAY:
+            return result
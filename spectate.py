@@ -0,0 +1,250 @@
+import asyncio
+import socket
+import struct
+import sys
+import threading
+from collections import Counter, deque
+
+# Message kinds. Every message is a 3-byte header (kind, payload length) and a payload.
+KEYFRAME = 1
+DELTA = 2
+HEADER = struct.Struct('<BH')
+
+# Delta flags
+HEAD_MOVED = 1     # Followed by the new head cell
+TAIL_REMOVED = 2   # The last body cell was dropped
+FOOD_CHANGED = 4   # Followed by the full food list
+BARRIERS_CHANGED = 8  # Followed by the barrier cells added and removed
+
+DEFAULT_PORT = 8765
+
+
+def pack_cells(cells):
+    """Count byte followed by one byte each for x and y."""
+    cells = list(cells)
+    return bytes([len(cells)]) + bytes(c for cell in cells for c in cell)
+
+
+def pack_barriers(cells):
+    cells = list(cells)
+    return struct.pack('<H', len(cells)) + bytes(c for cell in cells for c in cell)
+
+
+def message(kind, payload):
+    return HEADER.pack(kind, len(payload)) + payload
+
+
+def keyframe(width, height, body, food, barriers):
+    """Full board state; body cells go head first."""
+    return message(KEYFRAME, bytes([width, height]) + struct.pack('<H', len(body)) +
+                   bytes(c for cell in body for c in cell) + pack_cells(food) + pack_barriers(barriers))
+
+
+class SpectatorServer:
+    """Streams the board to any number of TCP spectators without slowing the game.
+
+    The server runs its own asyncio loop on a background thread. publish() is
+    called once per tick from the game thread. It turns the change since the
+    previous tick into a few bytes (new head, dropped tail, food and barrier
+    changes) and hands them to the loop, which writes them to every client.
+    A client whose send buffer backs up stops receiving deltas and gets a
+    fresh keyframe once it has caught up, so a slow spectator never stalls the
+    game or the other spectators.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT, max_buffer=64 * 1024):
+        self.max_buffer = max_buffer
+        self._clients = {}  # Writer -> True while the client needs a keyframe
+        self._snapshot = None
+        self._keyframe = None
+        self._last = None  # (head, length, food, barriers) as of the previous publish
+
+        self._loop = asyncio.new_event_loop()
+        started = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(host, port, started), name="spectator-server", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def _run(self, host, port, started):
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._on_connect, host, port))
+        started.set()
+        self._loop.run_forever()
+        # Every connection was closed by close(), so the client handlers finish on their own
+        self._loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(self._loop)))
+        self._loop.close()
+
+    async def _on_connect(self, reader, writer):
+        writer.transport.set_write_buffer_limits(high=self.max_buffer)
+        self._clients[writer] = True
+        if self._snapshot is not None:
+            self._send_keyframe(writer)
+        try:
+            await reader.read()  # Spectators don't send anything; wait for them to hang up
+        except ConnectionError:
+            pass
+        self._clients.pop(writer, None)
+        writer.close()
+
+    def reset(self):
+        """Start a new game: the next publish goes out as a keyframe."""
+        self._last = None
+
+    def publish(self, width, height, body, food, barriers):
+        """Send this tick's board. Cells are (x, y) tuples; food and barriers are lists of cells."""
+        head, length = body[0], len(body)
+        food = tuple(food)
+        barriers = tuple(barriers)
+        snapshot = (width, height, tuple(body), food, barriers)
+
+        delta = None
+        if self._last is not None:
+            last_head, last_length, last_food, last_barriers = self._last
+            moved = head != last_head
+            removed = last_length + moved - length
+            if removed in (0, 1) and (moved or removed == 0) and (not moved or length == 1 or body[1] == last_head):
+                flags = 0
+                payload = b''
+                if moved:
+                    flags |= HEAD_MOVED
+                    payload += bytes(head)
+                if removed:
+                    flags |= TAIL_REMOVED
+                if food != last_food:
+                    flags |= FOOD_CHANGED
+                    payload += pack_cells(food)
+                if barriers != last_barriers:
+                    flags |= BARRIERS_CHANGED
+                    counts, last_counts = Counter(barriers), Counter(last_barriers)
+                    payload += (pack_barriers((counts - last_counts).elements()) +
+                                pack_barriers((last_counts - counts).elements()))
+                delta = message(DELTA, bytes([flags]) + payload)
+        self._last = (head, length, food, barriers)
+        self._loop.call_soon_threadsafe(self._broadcast, delta, snapshot)
+
+    def _broadcast(self, delta, snapshot):
+        self._snapshot = snapshot
+        self._keyframe = None  # Built lazily, only if someone needs it
+        for writer, needs_keyframe in list(self._clients.items()):
+            if writer.transport.is_closing():
+                self._clients.pop(writer, None)
+            elif writer.transport.get_write_buffer_size() > self.max_buffer:
+                self._clients[writer] = True  # Too far behind: skip deltas until it catches up
+            elif needs_keyframe or delta is None:
+                self._send_keyframe(writer)
+            else:
+                writer.write(delta)
+
+    def _send_keyframe(self, writer):
+        if self._keyframe is None:
+            self._keyframe = keyframe(*self._snapshot)
+        writer.write(self._keyframe)
+        self._clients[writer] = False
+
+    def close(self):
+        def stop():
+            self._server.close()
+            for writer in self._clients:
+                writer.close()
+            self._loop.stop()
+        self._loop.call_soon_threadsafe(stop)
+        self._thread.join()
+
+
+class SpectatorBoard:
+    """Board state rebuilt from the stream, as kept by a spectator."""
+
+    def __init__(self):
+        self.width = self.height = 0
+        self.body = deque()
+        self.food = []
+        self.barriers = Counter()
+
+    def apply(self, kind, payload):
+        if kind == KEYFRAME:
+            self.width, self.height, count = payload[0], payload[1], struct.unpack_from('<H', payload, 2)[0]
+            offset = 4
+            self.body = deque((payload[offset + 2 * i], payload[offset + 2 * i + 1]) for i in range(count))
+            offset += 2 * count
+            self.food, offset = self._cells(payload, offset)
+            barriers, offset = self._barriers(payload, offset)
+            self.barriers = Counter(barriers)
+        elif kind == DELTA:
+            flags, offset = payload[0], 1
+            if flags & HEAD_MOVED:
+                self.body.appendleft((payload[offset], payload[offset + 1]))
+                offset += 2
+            if flags & TAIL_REMOVED:
+                self.body.pop()
+            if flags & FOOD_CHANGED:
+                self.food, offset = self._cells(payload, offset)
+            if flags & BARRIERS_CHANGED:
+                added, offset = self._barriers(payload, offset)
+                removed, offset = self._barriers(payload, offset)
+                self.barriers.update(added)
+                self.barriers.subtract(removed)
+                self.barriers += Counter()  # Drop cells no barrier is on any more
+
+    @staticmethod
+    def _cells(payload, offset):
+        count = payload[offset]
+        offset += 1
+        return [(payload[offset + 2 * i], payload[offset + 2 * i + 1]) for i in range(count)], offset + 2 * count
+
+    @staticmethod
+    def _barriers(payload, offset):
+        count = struct.unpack_from('<H', payload, offset)[0]
+        offset += 2
+        return [(payload[offset + 2 * i], payload[offset + 2 * i + 1]) for i in range(count)], offset + 2 * count
+
+
+def read_messages(sock, board, lock):
+    """Spectator thread: apply every message from the socket to the board."""
+    stream = sock.makefile('rb')
+    while True:
+        header = stream.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return  # Server went away
+        kind, length = HEADER.unpack(header)
+        payload = stream.read(length)
+        with lock:
+            board.apply(kind, payload)
+
+
+def watch(host='127.0.0.1', port=DEFAULT_PORT, cell_size=20):
+    """Reference spectator: connect to a running game and draw what it streams."""
+    import pygame
+
+    sock = socket.create_connection((host, port))
+    board = SpectatorBoard()
+    lock = threading.Lock()
+    threading.Thread(target=read_messages, args=(sock, board, lock), daemon=True).start()
+
+    pygame.init()
+    screen = pygame.display.set_mode((400, 400))
+    pygame.display.set_caption(f"Spectating {host}:{port}")
+    clock = pygame.time.Clock()
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sock.close()
+                return
+        with lock:
+            size = (board.width * cell_size, board.height * cell_size)
+            if size[0] and screen.get_size() != size:
+                screen = pygame.display.set_mode(size)
+            screen.fill((0, 0, 0))
+            for x, y in board.barriers:
+                pygame.draw.rect(screen, (255, 255, 0), (x * cell_size, y * cell_size, cell_size, cell_size))
+            for x, y in board.food:
+                pygame.draw.rect(screen, (255, 0, 0), (x * cell_size, y * cell_size, cell_size, cell_size))
+            for x, y in board.body:
+                pygame.draw.rect(screen, (0, 255, 0), (x * cell_size, y * cell_size, cell_size, cell_size))
+        pygame.display.flip()
+        clock.tick(30)
+
+
+if __name__ == "__main__":
+    watch(sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1',
+          int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT)
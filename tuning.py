@@ -0,0 +1,147 @@
+import argparse
+import json
+import os
+import random
+from multiprocessing import Pool
+
+from headless import HeadlessGame
+from heuristic import AI_WEIGHTS_FILE, DEFAULT_WEIGHTS, FEATURES, choose_move, load_weights, save_weights
+
+# Progress of the last tuning run, so it can be resumed
+CHECKPOINT_FILE = "stats/tuning_checkpoint.json"
+
+# Fixed games the elite is re-scored on before its weights are saved
+VALIDATION_GAMES = 30
+
+
+def play(weights, seed, max_steps=5000):
+    """Play one seeded headless game with the given weights and return the food eaten."""
+    game = HeadlessGame(seed)
+    stall_limit = 2 * game.grid_size * game.grid_size  # Give up on snakes that circle forever
+    last_meal = 0
+    while game.alive and game.steps < max_steps and game.steps - last_meal < stall_limit:
+        score = game.score
+        game.step(choose_move(game, weights))
+        if game.score != score:
+            last_meal = game.steps
+    return game.score
+
+
+def evaluate(task):
+    """Worker entry point: mean food eaten by a weight vector over a list of seeds."""
+    vector, seeds = task
+    weights = dict(zip(FEATURES, vector))
+    return sum(play(weights, seed) for seed in seeds) / len(seeds)
+
+
+def tournament(ranked, rng, size=3):
+    return max(rng.sample(ranked, size), key=lambda entry: entry[0])[1]
+
+
+def next_generation(ranked, rng, population_size, elite, sigma):
+    """Keep the elite and fill the rest with mutated crossovers of tournament winners."""
+    population = [vector for _, vector in ranked[:elite]]
+    while len(population) < population_size:
+        a, b = tournament(ranked, rng), tournament(ranked, rng)
+        population.append([
+            (x if rng.random() < 0.5 else y) + rng.gauss(0, sigma * max(1.0, abs(x), abs(y)))
+            for x, y in zip(a, b)
+        ])
+    return population
+
+
+def write_json(data, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temp_path, path)  # A crash mid-write keeps the previous checkpoint
+
+
+def evolve(generations=30, population_size=24, games=10, processes=None, seed=0, elite=4, sigma=0.3,
+           validation_games=VALIDATION_GAMES, checkpoint=CHECKPOINT_FILE, output=AI_WEIGHTS_FILE, fresh=False):
+    """Run a genetic algorithm over the heuristic weights, resuming from checkpoint if present.
+
+    Every candidate in a generation plays the same seeded games, spread across
+    a process pool. The elite is then re-scored on a fixed set of validation
+    seeds, and output is only replaced when a candidate beats the best
+    validation score so far, starting with the weights already in output.
+    The population is checkpointed after each generation; a checkpoint left by
+    a run with other settings is refused unless fresh is set, which starts over.
+    """
+    settings = {"seed": seed, "population_size": population_size, "games": games,
+                "elite": elite, "sigma": sigma, "validation_games": validation_games}
+    if os.path.exists(checkpoint) and not fresh:
+        with open(checkpoint) as file:
+            state = json.load(file)
+        if state.get("settings") != settings:
+            raise ValueError(f"{checkpoint} was written by a run with settings {state.get('settings')}, "
+                             f"not {settings}; start over with --fresh or delete it")
+        if state["generation"] >= generations:
+            print(f"{checkpoint} is already at generation {state['generation']}, nothing to do "
+                  f"(raise --generations to continue, or start over with --fresh)")
+            return state["best_weights"]
+        print(f"Resuming from generation {state['generation']}")
+    else:
+        rng = random.Random(seed)
+        start = [DEFAULT_WEIGHTS[name] for name in FEATURES]
+        population = [start] + [[w + rng.gauss(0, sigma * max(1.0, abs(w))) for w in start]
+                                for _ in range(population_size - 1)]
+        state = {"settings": settings, "generation": 0, "population": population,
+                 "best_fitness": None, "best_weights": None}
+
+    validation_seeds = list(range(validation_games))  # The same games every generation and every run
+    saved = load_weights(output) if state["best_fitness"] is None else None
+    if saved:
+        # A new run has to beat the weights already saved, not just its own first generation
+        state["best_weights"] = saved
+        state["best_fitness"] = evaluate(([saved[name] for name in FEATURES], validation_seeds))
+        print(f"Saved weights score {state['best_fitness']:.2f} on the validation games")
+
+    with Pool(processes) as pool:
+        for generation in range(state["generation"], generations):
+            rng = random.Random(seed * 1000003 + generation)  # Same stream when resumed
+            seeds = [rng.randrange(2 ** 32) for _ in range(games)]
+            fitness = pool.map(evaluate, [(vector, seeds) for vector in state["population"]])
+            ranked = sorted(zip(fitness, state["population"]), key=lambda entry: entry[0], reverse=True)
+
+            # A high score on this generation's seeds may just be luck, so only
+            # the validation score decides what gets saved
+            validated = pool.map(evaluate, [(vector, validation_seeds) for _, vector in ranked[:elite]])
+            best_fitness, best_vector = max(zip(validated, (vector for _, vector in ranked)),
+                                            key=lambda entry: entry[0])
+            if state["best_fitness"] is None or best_fitness > state["best_fitness"]:
+                state["best_fitness"] = best_fitness
+                state["best_weights"] = dict(zip(FEATURES, best_vector))
+                save_weights(state["best_weights"], output, fitness=best_fitness, generation=generation)
+            print(f"Generation {generation}: best {ranked[0][0]:.2f}, mean {sum(fitness) / len(fitness):.2f}, "
+                  f"best validated {best_fitness:.2f}, overall best {state['best_fitness']:.2f}")
+
+            state["population"] = next_generation(ranked, rng, population_size, elite, sigma)
+            state["generation"] = generation + 1
+            write_json(state, checkpoint)
+
+    return state["best_weights"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune the AI snake's heuristic weights on headless games.")
+    parser.add_argument("--generations", type=int, default=30)
+    parser.add_argument("--population", type=int, default=24)
+    parser.add_argument("--games", type=int, default=10, help="seeded games per candidate")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--validation-games", type=int, default=VALIDATION_GAMES,
+                        help="fixed games the elite is re-scored on before saving")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE)
+    parser.add_argument("--output", default=AI_WEIGHTS_FILE)
+    parser.add_argument("--fresh", action="store_true", help="ignore the checkpoint and start a new run")
+    args = parser.parse_args()
+    try:
+        evolve(args.generations, args.population, args.games, args.processes, args.seed,
+               validation_games=args.validation_games, checkpoint=args.checkpoint, output=args.output,
+               fresh=args.fresh)
+    except ValueError as error:
+        parser.exit(1, f"{error}\n")